@@ -0,0 +1,90 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:
+    MinHash = MinHashLSH = None
+
+# Near-duplicate chunks (estimated Jaccard similarity of their word sets at or
+# above this threshold) are dropped before embedding; 0 disables deduplication
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", 0))
+MINHASH_NUM_PERM = 64
+
+_lock = threading.Lock()
+_deduplicator = None
+
+
+def dedup_enabled() -> bool:
+    return CHUNK_DEDUP_THRESHOLD > 0 and MinHashLSH is not None
+
+
+def _minhash(entry: Dict) -> "MinHash":
+    words = entry.get("token_set") or set(entry.get("text", "").lower().split())
+    minhash = MinHash(num_perm=MINHASH_NUM_PERM)
+    minhash.update_batch([word.encode("utf-8") for word in words])
+    return minhash
+
+
+class ChunkDeduplicator:
+    """MinHash-LSH index over the word sets of chunks, keyed by the order they were added.
+
+    Chunk ids are not keys: files in one upload, or a re-upload, may share a name.
+    """
+
+    def __init__(self, threshold: float):
+        self.lsh = MinHashLSH(threshold=threshold, num_perm=MINHASH_NUM_PERM)
+        self.size = 0
+
+    def find(self, minhash: "MinHash") -> Optional[int]:
+        """Return the key of an indexed near-duplicate of the chunk, if any."""
+        matches = self.lsh.query(minhash)
+        return min(matches) if matches else None
+
+    def add(self, minhash: "MinHash") -> None:
+        self.lsh.insert(self.size, minhash)
+        self.size += 1
+
+
+def _get_deduplicator(get_existing_entries: Callable[[int], List[Dict]]) -> "ChunkDeduplicator":
+    """The index of the chunks stored in the knowledge base, keyed by row.
+
+    Built from the knowledge base on first use, then extended with the rows
+    stored since (by any worker), so it is never persisted.
+    """
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = ChunkDeduplicator(CHUNK_DEDUP_THRESHOLD)
+    for entry in get_existing_entries(_deduplicator.size):
+        _deduplicator.add(_minhash(entry))
+    return _deduplicator
+
+
+def new_upload_index() -> Optional["ChunkDeduplicator"]:
+    """Index of the chunks kept so far by one ingestion request, discarded with it."""
+    if not dedup_enabled():
+        return None
+    return ChunkDeduplicator(CHUNK_DEDUP_THRESHOLD)
+
+
+def deduplicate_entries(entries: List[Dict], get_existing_entries: Callable[[int], List[Dict]], upload_index: "ChunkDeduplicator") -> List[Dict]:
+    """Drop entries that near-duplicate a stored chunk or a chunk kept earlier in this upload.
+
+    get_existing_entries(start) returns the stored entries from row start on.
+    Only stored chunks reach the shared index, so a failed embedding or persist
+    never blocks a later upload of the same content.
+    """
+    if not dedup_enabled():
+        return entries
+    kept = []
+    with _lock:
+        deduplicator = _get_deduplicator(get_existing_entries)
+        for entry in entries:
+            minhash = _minhash(entry)
+            if deduplicator.find(minhash) is None and upload_index.find(minhash) is None:
+                upload_index.add(minhash)
+                kept.append(entry)
+    if len(kept) < len(entries):
+        print(f"[DEBUG] Dropped {len(entries) - len(kept)} near-duplicate chunks")
+    return kept
@@ -0,0 +1,219 @@
+import os
+import shutil
+import tempfile
+import asyncio
+from typing import List, Dict, Optional, Tuple
+from fastapi import UploadFile
+
+from services.text_extraction import extract_text_from_pdf, extract_text_with_ocr
+from services.knowledge_base import add_entries, get_entries
+from services.deduplication import dedup_enabled, deduplicate_entries, new_upload_index
+from utils import clean_text, smart_chunk_text, get_embeddings_batch, normalize_embeddings, EMBEDDING_CONCURRENCY
+
+# Number of files extracted/OCR'd concurrently
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", os.cpu_count() or 1))
+# PDFs whose text layer averages more characters per page than this are not OCR'd
+OCR_SKIP_CHARS_PER_PAGE = int(os.getenv("OCR_SKIP_CHARS_PER_PAGE", 500))
+# Chunks per embedding request, and how long to wait for a batch to fill
+EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_FLUSH_TIMEOUT = 0.5
+QUEUE_SIZE = 8
+# Bytes copied at a time when spilling an upload to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+def _spill_to_disk(upload) -> str:
+    """Copy an upload to a temporary PDF file without holding it in memory. Returns its path."""
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(upload, tmp, UPLOAD_CHUNK_SIZE)
+    return tmp.name
+
+
+async def extract_entries(file: UploadFile) -> List[Dict]:
+    """Extract and chunk a single PDF. Returns its knowledge base entries without embeddings."""
+    # Spill the upload to disk once; both extractors open the same file by path
+    pdf_path = await asyncio.to_thread(_spill_to_disk, file.file)
+
+    try:
+        # Try pdfplumber
+        text_data = await asyncio.to_thread(extract_text_from_pdf, pdf_path)
+        text = text_data["text"]
+        metadata = text_data["metadata"]
+        image_pages = text_data["image_pages"]
+
+        print(f"[DEBUG] Extracted text length from {file.filename}: {len(text)}")
+
+        # check for OCR text (additional supplement); born-digital PDFs already have a
+        # full text layer, otherwise only pages without one are OCR'd
+        chars_per_page = len(text) / max(metadata["pages"], 1)
+        if chars_per_page > OCR_SKIP_CHARS_PER_PAGE or image_pages == []:
+            print(f"[DEBUG] Skipping OCR for {file.filename} ({chars_per_page:.0f} chars/page)")
+            ocr_data = {"text": ""}
+        else:
+            ocr_data = await asyncio.to_thread(extract_text_with_ocr, pdf_path, image_pages)
+    finally:
+        os.remove(pdf_path)
+
+    # Combine both sources
+    if ocr_data["text"].strip():
+        text += "\n" + ocr_data["text"]
+        metadata["ocr_extracted"] = True
+        print(f"[DEBUG] OCR added {len(ocr_data['text'])} characters from {file.filename}")
+    else:
+        metadata["ocr_extracted"] = False
+        print(f"[DEBUG] No OCR text found in {file.filename}")
+
+    if len(text.strip()) == 0:
+        print(f"[WARNING] No text extracted from {file.filename}")
+        return []
+
+    # Clean and chunk
+    text = clean_text(text)
+    chunks = smart_chunk_text(text)
+
+    entries = []
+    for chunk_data in chunks:
+        entries.append({
+            "file_name": file.filename,
+            "chunk_id": f"{file.filename}_{chunk_data['chunk_id']}",
+            "text": chunk_data["text"],
+            "token_set": chunk_data["token_set"],
+            "metadata": {
+                **metadata,
+                "word_count": chunk_data["word_count"],
+                "char_count": chunk_data["char_count"]
+            }
+        })
+
+    return entries
+
+
+async def _extract_worker(file_queue: asyncio.Queue, chunk_queue: asyncio.Queue, processed_files: List[str], upload_index) -> None:
+    """Stage 1: extract text from files and emit chunk entries."""
+    while True:
+        file = await file_queue.get()
+        if file is _DONE:
+            return
+        try:
+            entries = kept = await extract_entries(file)
+            if entries and dedup_enabled():
+                # Near-duplicates of kept chunks are never embedded
+                kept = await asyncio.to_thread(deduplicate_entries, entries, get_entries, upload_index)
+        except Exception as e:
+            print(f"[ERROR] Failed to process {file.filename}: {str(e)}")
+            continue
+        if entries:
+            processed_files.append(file.filename)
+        for entry in kept:
+            await chunk_queue.put(entry)
+
+
+async def _embed_batch(batch: List[Dict]) -> Optional[List[Dict]]:
+    try:
+        embeddings = await get_embeddings_batch([entry["text"] for entry in batch])
+    except Exception as e:
+        print(f"[ERROR] Failed to generate embeddings for {len(batch)} chunks: {str(e)}")
+        return None
+    # Stored unit-length, so similarity at query time is a plain dot product
+    for entry, embedding in zip(batch, normalize_embeddings(embeddings)):
+        entry["embedding"] = embedding
+    return batch
+
+
+async def _embed_worker(chunk_queue: asyncio.Queue, entry_queue: asyncio.Queue) -> None:
+    """Stage 2: group chunks and flush a batched embedding call on batch size or timeout.
+
+    Each flush starts its request as a task and queues the task in order, so
+    about EMBEDDING_CONCURRENCY embedding requests are in flight at once.
+    """
+    loop = asyncio.get_running_loop()
+    batch = []
+    deadline = None
+    while True:
+        timeout = None if deadline is None else max(deadline - loop.time(), 0)
+        try:
+            entry = await asyncio.wait_for(chunk_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            entry = None
+
+        if entry is not None and entry is not _DONE:
+            batch.append(entry)
+            if deadline is None:
+                deadline = loop.time() + EMBEDDING_FLUSH_TIMEOUT
+
+        if batch and (entry is None or entry is _DONE or len(batch) >= EMBEDDING_BATCH_SIZE):
+            await entry_queue.put(asyncio.ensure_future(_embed_batch(batch)))
+            batch, deadline = [], None
+
+        if entry is _DONE:
+            await entry_queue.put(_DONE)
+            return
+
+
+async def _persist_worker(entry_queue: asyncio.Queue, ingested: List[Dict]) -> None:
+    """Stage 3: append embedded entries to the knowledge base, in chunk order."""
+    while True:
+        task = await entry_queue.get()
+        if task is _DONE:
+            return
+        batch = await task
+        if batch is None:
+            continue
+        await asyncio.to_thread(add_entries, batch)
+        ingested.extend(batch)
+
+
+async def run_ingestion_pipeline(files: List[UploadFile]) -> Tuple[List[Dict], List[str]]:
+    """Ingest files through overlapping extract -> embed -> persist stages.
+
+    Returns the entries added to the knowledge base and the names of the files
+    that produced content.
+    """
+    file_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    chunk_queue = asyncio.Queue(maxsize=QUEUE_SIZE * EMBEDDING_BATCH_SIZE)
+    entry_queue = asyncio.Queue(maxsize=EMBEDDING_CONCURRENCY)
+    processed_files, ingested = [], []
+    num_workers = max(1, min(OCR_CONCURRENCY, len(files)))
+    upload_index = new_upload_index()
+
+    async def produce():
+        for file in files:
+            await file_queue.put(file)
+        for _ in range(num_workers):
+            await file_queue.put(_DONE)
+
+    async def extract():
+        await asyncio.gather(*[_extract_worker(file_queue, chunk_queue, processed_files, upload_index) for _ in range(num_workers)])
+        await chunk_queue.put(_DONE)
+
+    stages = [
+        asyncio.ensure_future(produce()),
+        asyncio.ensure_future(extract()),
+        asyncio.ensure_future(_embed_worker(chunk_queue, entry_queue)),
+        asyncio.ensure_future(_persist_worker(entry_queue, ingested)),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        # As in a TaskGroup, a failing stage (or a cancelled request) stops the
+        # others and any queued embedding requests instead of leaving them
+        # blocked on full queues
+        pending = [stage for stage in stages if not stage.done()]
+        while not entry_queue.empty():
+            task = entry_queue.get_nowait()
+            if task is not _DONE:
+                pending.append(task)
+        while pending:
+            for task in pending:
+                task.cancel()
+            # Before Python 3.12, wait_for drops a cancel that races a finished
+            # chunk_queue.get(), so cancel again until every stage has stopped
+            _, pending = await asyncio.wait(pending, timeout=0.1)
+
+    # Keep the upload order for the response
+    processed_files.sort(key=[file.filename for file in files].index)
+    return ingested, processed_files
@@ -1,7 +1,105 @@
+import os
+import re
+import time
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from mistralai import Mistral
 
-def detect_query_intent(query: str, llm_client: Mistral) -> str:
-    """Enhanced intent detection using LLM."""
+from services.query import Query
+
+# Detected intents by exact lowercased query, kept in memory (LRU) and persisted
+# in SQLite so a restart starts warm; the table keeps the INTENT_CACHE_SIZE most
+# recently stored entries
+INTENT_CACHE_SIZE = 4096
+INTENT_CACHE_DB = os.path.join("knowledge_base", "intent_cache.sqlite")
+_intent_cache: "OrderedDict[str, str]" = OrderedDict()
+# Writes run one at a time on their own thread, off the request path
+_intent_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intent-cache")
+# Connection owned by the writer thread
+_intent_db: Optional[sqlite3.Connection] = None
+
+# Queries that are nothing but a greeting or a goodbye need no LLM call
+_GREETING_RE = re.compile(r"(hi|hello|hey|good (morning|afternoon|evening))( there| everyone| again)?[\s!.,]*")
+_FINISH_RE = re.compile(r"(bye|goodbye|thanks|thank you|that's all|i'm done|see you|farewell)( so much| a lot| again| for your help)?[\s!.,]*")
+
+def _rule_based_intent(query_lower: str) -> Optional[str]:
+    """Intent of an unambiguous greeting/goodbye query, else None."""
+    if _GREETING_RE.fullmatch(query_lower):
+        return "greeting"
+    if _FINISH_RE.fullmatch(query_lower):
+        return "finish"
+    return None
+
+def is_small_talk(query: Query) -> bool:
+    """True for a plain greeting/goodbye, which is answered without retrieval."""
+    return _rule_based_intent(query.lower) is not None
+
+def _connect_intent_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(INTENT_CACHE_DB), exist_ok=True)
+    db = sqlite3.connect(INTENT_CACHE_DB)
+    db.execute("CREATE TABLE IF NOT EXISTS intents (query TEXT PRIMARY KEY, intent TEXT NOT NULL, stored REAL NOT NULL)")
+    db.execute("CREATE INDEX IF NOT EXISTS intents_stored ON intents (stored)")
+    return db
+
+def load_intent_cache() -> None:
+    """Fill the in-memory cache from the persisted store; called once at startup."""
+    try:
+        db = _connect_intent_db()
+        try:
+            rows = db.execute("SELECT query, intent FROM intents ORDER BY stored DESC LIMIT ?", (INTENT_CACHE_SIZE,)).fetchall()
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"[DEBUG] Intent cache not loaded: {e}")
+        return
+    _intent_cache.clear()
+    # Oldest first, so the LRU evicts in stored order
+    _intent_cache.update(reversed(rows))
+
+def _remember_intent(query_lower: str, intent: str) -> None:
+    _intent_cache[query_lower] = intent
+    _intent_cache.move_to_end(query_lower)
+    while len(_intent_cache) > INTENT_CACHE_SIZE:
+        _intent_cache.popitem(last=False)
+
+def _persist_intent(query_lower: str, intent: str) -> None:
+    global _intent_db
+    try:
+        if _intent_db is None:
+            _intent_db = _connect_intent_db()
+        with _intent_db:
+            _intent_db.execute("INSERT OR REPLACE INTO intents (query, intent, stored) VALUES (?, ?, ?)", (query_lower, intent, time.time()))
+            # Freed pages are reused, so the file stays bounded too
+            _intent_db.execute(
+                "DELETE FROM intents WHERE stored < (SELECT stored FROM intents ORDER BY stored DESC LIMIT 1 OFFSET ?)",
+                (INTENT_CACHE_SIZE - 1,),
+            )
+    except Exception as e:
+        # e.g. another worker holds the database locked; the in-memory cache still applies
+        print(f"[WARNING] Could not persist intent cache entry: {e}")
+
+async def detect_query_intent(query: Query, llm_client: Mistral) -> str:
+    """Detect the query intent: rules for plain greetings/goodbyes, then the cache, then the LLM."""
+    query_lower = query.lower
+    intent = _rule_based_intent(query_lower)
+    if intent is not None:
+        return intent
+    
+    if query_lower in _intent_cache:
+        _intent_cache.move_to_end(query_lower)
+        return _intent_cache[query_lower]
+    
+    intent = await _llm_intent_detection(query.raw, llm_client)
+    if intent is not None:
+        _remember_intent(query_lower, intent)
+        _intent_writer.submit(_persist_intent, query_lower, intent)
+        return intent
+    return _fallback_intent_detection(query.raw)
+
+async def _llm_intent_detection(query: str, llm_client: Mistral) -> Optional[str]:
+    """Enhanced intent detection using LLM. Returns None if the LLM call fails."""
     try:
         intent_prompt = f"""Analyze the following user query and determine its intent. Return only one of these exact categories:
 
@@ -17,7 +115,7 @@ def detect_query_intent(query: str, llm_client: Mistral) -> str:
 
         Intent:"""
 
-        response = llm_client.chat.complete(
+        response = await llm_client.chat.complete_async(
             model="mistral-small-latest",
             messages=[{"role": "user", "content": intent_prompt}],
             temperature=0.1,
@@ -35,7 +133,7 @@ def detect_query_intent(query: str, llm_client: Mistral) -> str:
             
     except Exception as e:
         print(f"[ERROR] LLM intent detection failed: {e}, using fallback")
-        return _fallback_intent_detection(query)
+        return None
 
 def _fallback_intent_detection(query: str) -> str:
     """Fallback rule-based intent detection."""
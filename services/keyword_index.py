@@ -0,0 +1,62 @@
+import os
+import pickle
+from collections import Counter
+from typing import AbstractSet, Dict, Iterable, List
+
+
+def tokenize(text: str) -> List[str]:
+    """Keyword analyzer shared by indexing and querying."""
+    return text.lower().split()
+
+
+class KeywordIndex:
+    """Inverted index over chunk texts, precomputed at ingest time.
+
+    postings maps each term to the ids of the documents containing it, and
+    doc_lens holds the number of unique terms per document, so a query only
+    touches the postings of its own terms.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = {}
+        self.doc_lens: List[int] = []
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lens)
+
+    def add(self, texts: Iterable[str]) -> None:
+        self.add_term_sets(set(tokenize(text)) for text in texts)
+
+    def add_term_sets(self, term_sets: Iterable[AbstractSet[str]]) -> None:
+        """Add documents already tokenized into their sets of unique terms."""
+        for terms in term_sets:
+            doc_id = len(self.doc_lens)
+            self.doc_lens.append(len(terms))
+            for term in terms:
+                self.postings.setdefault(term, []).append(doc_id)
+
+    def score(self, query_words: Iterable[str]) -> Dict[int, float]:
+        """Fraction of each matching document's unique terms that appear in the query."""
+        overlap = Counter()
+        for word in set(query_words):
+            overlap.update(self.postings.get(word, ()))
+        return {doc_id: count / self.doc_lens[doc_id] for doc_id, count in overlap.items()}
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"postings": self.postings, "doc_lens": self.doc_lens}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        index = cls()
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    data = pickle.load(f)
+                index.postings, index.doc_lens = data["postings"], data["doc_lens"]
+            except Exception as e:
+                print(f"[WARNING] Could not load keyword index from {path}: {e}")
+        return index
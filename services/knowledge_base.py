@@ -0,0 +1,873 @@
+import os
+import glob
+import orjson
+import heapq
+import sqlite3
+import threading
+import numpy as np
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Tuple, Optional, Union
+
+from utils import normalize_embeddings
+from services.keyword_index import KeywordIndex, tokenize
+from services.query import Query
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the write lock falls back to msvcrt
+    fcntl = None
+    import msvcrt
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    from services.scoring_kernel import topk_cosine
+except ImportError:
+    topk_cosine = None
+
+# Columnar layout: embeddings live in float32 .npy shards named by their first
+# row (one per ingestion batch, merged as they accumulate, memory-mapped on
+# load), metadata in a SQLite table whose row i describes row i of the
+# concatenated shards. Only the rows a search
+# returns are read back, so metadata is never loaded as a whole.
+KB_DIR = "knowledge_base"
+META_DB = os.path.join(KB_DIR, "meta.sqlite")
+# flock'd by whichever worker process is writing to KB_DIR
+WRITE_LOCK_FILE = os.path.join(KB_DIR, ".write.lock")
+EMBEDDING_SHARD_PATTERN = os.path.join(KB_DIR, "emb_*.npy")
+KEYWORD_INDEX_FILE = os.path.join(KB_DIR, "keyword_index.pkl")
+# The original single-file knowledge base, embeddings inline
+LEGACY_KB_FILE = "knowledge_base.json"
+# Score on the GPU when one is available; brute force there outruns a CPU index
+KB_DEVICE = "cuda" if torch is not None and torch.cuda.is_available() else None
+# "int8" keeps the in-memory search copy scalar-quantized (4x smaller than
+# float32); the float32 shards on disk are unchanged
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none").lower()
+# "hnsw" builds an approximate FAISS HNSW graph instead of the exact flat index;
+# the graph is persisted so it is not rebuilt at every start
+EMBEDDING_INDEX = os.getenv("EMBEDDING_INDEX", "flat").lower()
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+# Number of dimensions the FAISS index keeps after a PCA projection, applied once
+# the knowledge base holds PCA_MIN_ROWS vectors (0 keeps all dimensions).
+# Candidates are re-scored exactly against the full float32 shards.
+EMBEDDING_PCA_DIM = int(os.getenv("EMBEDDING_PCA_DIM", 0))
+PCA_MIN_ROWS = 10000
+PCA_RERANK_FACTOR = 4
+# The FAISS SQ8 ranges are trained once the knowledge base holds SQ_MIN_ROWS
+# vectors (the index stays float32 until then), so they fit the whole corpus
+SQ_MIN_ROWS = 10000
+# Rows sampled to train the PCA projection and the SQ8 ranges
+TRAIN_SAMPLE_ROWS = 50000
+# The newest shard is merged into the one before while it is at least as large
+# and the result holds at most SHARD_MAX_ROWS rows, so N rows span O(log N)
+# shards below the cap (131072 x 1024-d float32 = 512 MB)
+SHARD_MAX_ROWS = 1 << 17
+# Rows scored per block by the NumPy backend (1024 x 1024-d float32 = 4 MB)
+TILE_ROWS = 1024
+# Rows added to the FAISS index per exclusive section, so searches interleave with a large add
+INDEX_ADD_ROWS = 4096
+
+if faiss is not None:
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+
+
+class _ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds off new readers.
+
+    The writing thread may re-enter either side.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writer = None
+        self._depth = 0
+
+    @contextmanager
+    def read(self):
+        if self._writer == threading.get_ident():
+            yield
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._writers_waiting -= 1
+                self._writer = me
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+# Serializes changes to the in-memory state below; endpoints call in from worker threads
+_lock = threading.RLock()
+# Searches read the state below under the shared side. Writers (holding _lock)
+# publish changes under the exclusive side, kept short so a search never waits
+# on an ingest's shard write, metadata insert or index build
+_index_lock = _ReadWriteLock()
+# Per-thread read connections to META_DB
+_local = threading.local()
+# Open WRITE_LOCK_FILE while this process holds the inter-process write lock,
+# and how many nested _write_lock() blocks hold it (only touched under _lock)
+_write_lock_file = None
+_write_lock_depth = 0
+
+# In-memory state: the index rows; their metadata is fetched from META_DB by row
+_db: Optional[sqlite3.Connection] = None
+_num_entries = 0
+_shards: List[np.ndarray] = []
+# (int8 codes, per-row scales) parallel to _shards when EMBEDDING_QUANTIZATION is "int8"
+_quantized_shards: List[Tuple[np.ndarray, np.ndarray]] = []
+# First row of each of _shards, then the total row count
+_shard_offsets = np.zeros(1, dtype=np.int64)
+_index = None
+# GPU copy of the rows: a view of _kb_buffer, which grows geometrically
+_kb_tensor = None
+_kb_buffer = None
+_keyword_index = KeywordIndex()
+# Bumped whenever entries are added, so callers can invalidate derived caches
+_version = 0
+# PRAGMA data_version of META_DB when it was last synced, used to pick up writes from other workers
+_data_version: Optional[int] = None
+
+
+def _lock_file(file) -> None:
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        return
+    file.seek(0)
+    while True:
+        try:
+            # Locks the first byte; LK_LOCK gives up after about 10 seconds
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(file) -> None:
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_UN)
+        return
+    file.seek(0)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _write_lock():
+    """Exclusive across worker processes for a whole refresh -> shard write -> insert sequence.
+
+    Callers hold _lock; nesting within this process is allowed.
+    """
+    global _write_lock_file, _write_lock_depth
+
+    if _write_lock_depth == 0:
+        os.makedirs(KB_DIR, exist_ok=True)
+        _write_lock_file = open(WRITE_LOCK_FILE, "a")
+        _lock_file(_write_lock_file)
+    _write_lock_depth += 1
+    try:
+        yield
+    finally:
+        _write_lock_depth -= 1
+        if _write_lock_depth == 0:
+            _unlock_file(_write_lock_file)
+            _write_lock_file.close()
+            _write_lock_file = None
+
+
+def _shard_paths() -> List[str]:
+    return sorted(glob.glob(EMBEDDING_SHARD_PATTERN))
+
+
+def _shard_path(first_row: int) -> str:
+    return os.path.join(KB_DIR, f"emb_{first_row:010d}.npy")
+
+
+def _shard_start(path: str) -> int:
+    return int(os.path.basename(path)[4:-4])
+
+
+def _shard_rows(path: str) -> int:
+    return len(np.load(path, mmap_mode="r"))
+
+
+def _write_shard(embeddings, path: str) -> np.ndarray:
+    """Persist embeddings as a float32 shard and return it memory-mapped.
+
+    The file is replaced atomically so existing memory maps of an older
+    version stay valid.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def _quantized() -> bool:
+    return EMBEDDING_QUANTIZATION == "int8"
+
+
+def _quantize(mat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: mat ~= codes * scales[:, None]."""
+    scales = np.abs(mat).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(mat / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _hnsw() -> bool:
+    return EMBEDDING_INDEX == "hnsw" and KB_DEVICE is None and faiss is not None
+
+
+def _pca() -> bool:
+    return EMBEDDING_PCA_DIM > 0 and KB_DEVICE is None and faiss is not None
+
+
+def _pca_applied() -> bool:
+    return faiss is not None and isinstance(_index, faiss.IndexPreTransform)
+
+
+def _sq_applied() -> bool:
+    if faiss is None or _index is None:
+        return False
+    index = faiss.downcast_index(_index.index) if _pca_applied() else _index
+    return isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexHNSWSQ))
+
+
+def _faiss_index_path() -> str:
+    # Named by index type, so switching EMBEDDING_QUANTIZATION or EMBEDDING_PCA_DIM never loads a mismatched graph
+    pca = f"_pca{EMBEDDING_PCA_DIM}" if _pca() else ""
+    return os.path.join(KB_DIR, f"hnsw{'_sq8' if _quantized() else ''}{pca}.faiss")
+
+
+def _new_faiss_index(vectors: np.ndarray):
+    """A new, empty FAISS index; vectors are its training rows, too few of which keep it float32."""
+    d = vectors.shape[1]
+    quantize = _quantized() and len(vectors) >= SQ_MIN_ROWS
+    if _hnsw():
+        if quantize:
+            index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        else:
+            index = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    if quantize:
+        # Per-dimension ranges; values outside them in later shards are clipped
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        return index
+    return faiss.IndexFlatIP(d)
+
+
+def _row_vectors(ids: np.ndarray) -> np.ndarray:
+    """Full-precision embeddings of the given index rows, read from the shards."""
+    if len(ids) == 0:
+        return np.empty((0, _shards[0].shape[1]), dtype=np.float32)
+    shard_ids = np.searchsorted(_shard_offsets, ids, side="right") - 1
+    return np.stack([_shards[s][i - _shard_offsets[s]] for s, i in zip(shard_ids.tolist(), ids.tolist())])
+
+
+def _new_trained_index():
+    """Rebuild the FAISS index, with its PCA projection and SQ8 ranges trained on a sample of the rows indexed so far."""
+    rows = sum(len(shard) for shard in _shards)
+    if rows > TRAIN_SAMPLE_ROWS:
+        sample = _row_vectors(np.sort(np.random.default_rng(0).choice(rows, TRAIN_SAMPLE_ROWS, replace=False)))
+    else:
+        sample = np.concatenate(_shards)
+    if _pca() and rows >= PCA_MIN_ROWS and EMBEDDING_PCA_DIM < sample.shape[1]:
+        pca = faiss.PCAMatrix(sample.shape[1], EMBEDDING_PCA_DIM)
+        pca.train(sample)
+        index = faiss.IndexPreTransform(pca, _new_faiss_index(pca.apply(sample)))
+    else:
+        index = _new_faiss_index(sample)
+    for shard in _shards:
+        index.add(np.ascontiguousarray(shard))
+    return index
+
+
+def _load_faiss_index() -> None:
+    """Load the persisted HNSW graph; rows added after it was saved are indexed on sync."""
+    global _index
+
+    path = _faiss_index_path()
+    if not _hnsw() or not os.path.exists(path):
+        return
+    try:
+        _index = faiss.read_index(path)
+        graph = faiss.downcast_index(_index.index) if _pca_applied() else _index
+        graph.hnsw.efSearch = HNSW_EF_SEARCH
+    except Exception as e:
+        print(f"[WARNING] Could not load FAISS index from {path}: {e}")
+        _index = None
+
+
+def save_index() -> None:
+    """Persist the HNSW graph (flat indexes are rebuilt from the shards instead)."""
+    with _lock:
+        if not _hnsw() or _index is None:
+            return
+        path = _faiss_index_path()
+        # Per-process temp file: several workers may save at once
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(_index, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def _backend_name() -> str:
+    if KB_DEVICE is not None:
+        return f"PyTorch ({KB_DEVICE}, {'fp16' if _quantized() else 'fp32'})"
+    if faiss is not None:
+        name = "FAISS HNSW" if _hnsw() else "FAISS"
+        if _pca_applied():
+            name += f" (PCA {EMBEDDING_PCA_DIM})"
+        return f"{name} (SQ8)" if _sq_applied() else name
+    if _quantized():
+        return "NumPy (int8)"
+    return "Numba" if topk_cosine is not None else "NumPy"
+
+
+def _set_shards(shards: List[np.ndarray], quantized_shards: List[Tuple[np.ndarray, np.ndarray]]) -> None:
+    """Swap in new shard lists; callers hold the exclusive side of _index_lock."""
+    global _shards, _quantized_shards, _shard_offsets
+
+    _shards, _quantized_shards = shards, quantized_shards
+    _shard_offsets = np.cumsum([0] + [len(shard) for shard in shards], dtype=np.int64)
+
+
+def _add_to_index(shard: np.ndarray) -> None:
+    """Add a shard of normalized embeddings to the resident vector index.
+
+    Called under _lock. New structures are built first and swapped in under
+    the exclusive side of _index_lock.
+    """
+    global _index, _kb_tensor, _kb_buffer
+
+    indexed_rows = int(_shard_offsets[-1])
+    if KB_DEVICE is not None:
+        block = torch.tensor(shard, device=KB_DEVICE)
+        if _quantized():
+            block = block.half()
+        rows = indexed_rows + len(block)
+        buffer = _kb_buffer
+        if buffer is None or rows > len(buffer):
+            # Doubling keeps appends amortized O(new rows); searches keep using the old buffer meanwhile
+            buffer = torch.empty((max(rows, 2 * indexed_rows), block.shape[1]), dtype=block.dtype, device=KB_DEVICE)
+            if indexed_rows:
+                buffer[:indexed_rows] = _kb_tensor
+        # Past the rows searches read, so written outside the exclusive section
+        buffer[indexed_rows:rows] = block
+        with _index_lock.write():
+            _set_shards(_shards + [shard], _quantized_shards)
+            _kb_buffer, _kb_tensor = buffer, buffer[:rows]
+    elif faiss is not None:
+        vectors = np.ascontiguousarray(shard)
+        index = _index if _index is not None else _new_faiss_index(vectors)
+        with _index_lock.write():
+            _set_shards(_shards + [shard], _quantized_shards)
+            _index = index
+        # A loaded HNSW graph already holds a prefix of the rows
+        skip = max(0, _index.ntotal - indexed_rows)
+        for start in range(skip, len(vectors), INDEX_ADD_ROWS):
+            # FAISS indexes cannot be searched during an add
+            with _index_lock.write():
+                _index.add(vectors[start:start + INDEX_ADD_ROWS])
+        wants_pca = _pca() and not _pca_applied() and _index.ntotal >= PCA_MIN_ROWS and EMBEDDING_PCA_DIM < _index.d
+        wants_sq = _quantized() and not _sq_applied() and _index.ntotal >= SQ_MIN_ROWS
+        if wants_pca or wants_sq:
+            # Large enough to fit a representative projection or quantizer; reindex
+            index = _new_trained_index()
+            with _index_lock.write():
+                _index = index
+    else:
+        quantized_shards = _quantized_shards + [_quantize(np.asarray(shard))] if _quantized() else _quantized_shards
+        with _index_lock.write():
+            _set_shards(_shards + [shard], quantized_shards)
+
+
+def _compact_shards() -> None:
+    """Merge trailing shard files like a binary counter, so their number stays logarithmic.
+
+    Only safe under _write_lock(). Each merge rewrites the older file in place
+    (existing memory maps of it stay valid) before the newer one is removed.
+    """
+    paths = _shard_paths()
+    sizes = [_shard_rows(path) for path in paths]
+    # A merge interrupted before removing its newer file leaves rows the file before also holds
+    for i in range(len(paths) - 1, 0, -1):
+        if _shard_start(paths[i]) + sizes[i] <= _shard_start(paths[i - 1]) + sizes[i - 1]:
+            os.remove(paths.pop(i))
+            sizes.pop(i)
+
+    while len(paths) >= 2 and sizes[-2] <= sizes[-1] and sizes[-2] + sizes[-1] <= SHARD_MAX_ROWS:
+        older, newer = np.load(paths[-2], mmap_mode="r"), np.load(paths[-1], mmap_mode="r")
+        tmp_path = paths[-2] + ".tmp"
+        merged = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(older) + len(newer), older.shape[1]))
+        merged[:len(older)] = older
+        merged[len(older):] = newer
+        merged.flush()
+        del merged
+        os.replace(tmp_path, paths[-2])
+        os.remove(paths.pop())
+        merged_rows = sizes.pop()
+        sizes[-1] += merged_rows
+
+
+def _coalesce_shards() -> None:
+    """Replace the in-memory shards that one (merged) file on disk now holds by a single map of it.
+
+    Keeps per-shard work at search time (scoring loops, row lookups)
+    proportional to the number of files rather than of ingested batches.
+    """
+    total = int(_shard_offsets[-1])
+    starts = {offset: i for i, offset in enumerate(_shard_offsets.tolist())}
+    shards, quantized_shards, changed = [], [], False
+    covered = 0
+    for path in _shard_paths():
+        first = _shard_start(path)
+        if first >= total:
+            break
+        try:
+            mapped = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            # Merged away by another worker since it was listed
+            return
+        last = min(first + len(mapped), total)
+        i, j = starts.get(first), starts.get(last)
+        if i is None or j is None or i != covered:
+            # The files do not line up with what is indexed; keep the current layout
+            return
+        covered = j
+        if j - i > 1:
+            shards.append(mapped[:last - first])
+            if _quantized_shards:
+                codes, scales = zip(*_quantized_shards[i:j])
+                quantized_shards.append((np.concatenate(codes), np.concatenate(scales)))
+            changed = True
+        else:
+            shards.extend(_shards[i:j])
+            quantized_shards.extend(_quantized_shards[i:j])
+    if changed and covered == len(_shards):
+        with _index_lock.write():
+            _set_shards(shards, quantized_shards)
+
+
+# Metadata rows are stored as JSON text, NumPy values serialized natively
+_META_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # The writer connection, shared by the endpoint threads under _lock
+    db = sqlite3.connect(path, check_same_thread=False)
+    # WAL: other workers keep reading while one ingests
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, chunk_id TEXT, data TEXT NOT NULL)")
+    return db
+
+
+def _insert_rows(db: sqlite3.Connection, first: int, entries: List[Dict]) -> None:
+    with db:
+        db.executemany(
+            "INSERT INTO chunks (row, chunk_id, data) VALUES (?, ?, ?)",
+            ((first + i, entry.get("chunk_id"), orjson.dumps(entry, option=_META_OPTIONS).decode())
+             for i, entry in enumerate(entries)),
+        )
+
+
+def _reader() -> sqlite3.Connection:
+    """This thread's read connection to META_DB; under WAL it reads while the writer inserts."""
+    if getattr(_local, "owner", None) is not _db:
+        # First use in this thread, or META_DB was reopened by load_knowledge_base
+        if getattr(_local, "db", None) is not None:
+            _local.db.close()
+        _local.db, _local.owner = sqlite3.connect(META_DB), _db
+    return _local.db
+
+
+def _fetch_entries(rows: List[int]) -> List[Dict]:
+    """Return the metadata of the given index rows, in the same order."""
+    if not rows:
+        return []
+    cursor = _reader().execute("SELECT row, data FROM chunks WHERE row IN (SELECT value FROM json_each(?))", (orjson.dumps(rows),))
+    by_row = {row: orjson.loads(data) for row, data in cursor}
+    return [by_row[row] for row in rows]
+
+
+def _fetch_texts(first: int, last: int) -> Iterator[str]:
+    cursor = _db.execute("SELECT json_extract(data, '$.text') FROM chunks WHERE row >= ? AND row < ? ORDER BY row", (first, last))
+    return (text or "" for text, in cursor)
+
+
+def _migrate_legacy_kb() -> None:
+    """Move the original JSON knowledge base (embeddings inline) to META_DB and a shard."""
+    if os.path.exists(META_DB) or not os.path.exists(LEGACY_KB_FILE):
+        return
+
+    with open(LEGACY_KB_FILE, "rb") as f:
+        entries = [entry for entry in orjson.loads(f.read()) if entry.get("embedding") is not None]
+    if entries:
+        # Stored unit-length, as ingestion does; later loads only memory-map the shards
+        _write_shard(normalize_embeddings([entry.pop("embedding") for entry in entries]), _shard_path(0))
+
+    # Built under a temporary name, so an interrupted migration is redone
+    tmp_path = META_DB + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = _connect(tmp_path)
+    _insert_rows(db, 0, entries)
+    db.close()
+    os.replace(tmp_path, META_DB)
+
+    print(f"[INFO] Migrated {len(entries)} entries from {LEGACY_KB_FILE} to {META_DB}")
+
+
+def _meta_rows() -> int:
+    return _db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+
+def _sync() -> None:
+    """Index the metadata rows and embedding rows appended since the last sync.
+
+    Only rows past the last indexed one are read, so picking up another
+    worker's ingest costs O(new entries) rather than a full reload.
+    """
+    global _data_version, _version
+
+    _data_version = _db.execute("PRAGMA data_version").fetchone()[0]
+    meta_rows = _meta_rows()
+
+    for path in _shard_paths():
+        if _num_entries >= meta_rows:
+            break
+        first = _shard_start(path)
+        try:
+            shard = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            # Merged into the file before it by another worker since it was listed
+            break
+        last = min(first + len(shard), meta_rows)
+        if last <= _num_entries:
+            continue
+        if first > _num_entries:
+            break
+        _add_to_index(shard[_num_entries - first:last - first])
+        _add_rows(last - _num_entries)
+        _version += 1
+
+    if _num_entries < meta_rows:
+        # Rows are missing from the listing (a concurrent merge); pick them up on the next refresh
+        _data_version = None
+    _coalesce_shards()
+
+
+def _add_rows(count: int, token_sets: Optional[List] = None) -> None:
+    """Publish new index rows and extend the keyword index with any it does not cover yet.
+
+    token_sets, if given, are the new entries' precomputed keyword term sets.
+    """
+    global _num_entries
+
+    first = _num_entries
+    covered = min(count, max(0, _keyword_index.num_docs - first))
+    if token_sets is not None:
+        new_sets = token_sets[covered:]
+    elif covered < count:
+        new_sets = [set(tokenize(text)) for text in _fetch_texts(first + covered, first + count)]
+    else:
+        new_sets = []
+    with _index_lock.write():
+        _keyword_index.add_term_sets(new_sets)
+        _num_entries += count
+
+
+def _drop_orphan_rows() -> None:
+    """Remove trailing embedding rows that never got metadata (interrupted ingest).
+
+    Only safe under _write_lock(): another worker's pending shard would look orphaned.
+    """
+    for path in reversed(_shard_paths()):
+        first = _shard_start(path)
+        if first >= _num_entries:
+            os.remove(path)
+            continue
+        if first + _shard_rows(path) > _num_entries:
+            _write_shard(np.load(path)[:_num_entries - first], path)
+        return
+
+
+def _refresh_if_changed() -> None:
+    """Pick up changes to META_DB made outside this process."""
+    if _db is None or not os.path.exists(META_DB):
+        load_knowledge_base()
+        return
+    # Only changes when another connection commits
+    if _db.execute("PRAGMA data_version").fetchone()[0] == _data_version:
+        return
+    if _meta_rows() < _num_entries:
+        # Rows were deleted or the table rewritten; the indexed rows are no longer valid
+        load_knowledge_base()
+    else:
+        _sync()
+
+
+def _refresh_for_read() -> None:
+    """Pick up other workers' writes before a read, unless this process is writing.
+
+    An ingest in progress has only published complete batches, so a search
+    runs on those rather than queueing behind it.
+    """
+    if _lock.acquire(blocking=_db is None):
+        try:
+            _refresh_if_changed()
+        finally:
+            _lock.release()
+
+
+def load_knowledge_base() -> None:
+    """Open the knowledge base on disk and build the vector index."""
+    global _db, _num_entries, _index, _kb_tensor, _kb_buffer, _keyword_index, _version
+
+    # The write lock covers the migration and index saves.
+    # Searches wait for the whole (re)load, which only follows startup or a rewritten META_DB
+    with _lock, _write_lock(), _index_lock.write():
+        _migrate_legacy_kb()
+        if _db is not None:
+            _db.close()
+        _db = _connect(META_DB)
+
+        _num_entries, _index, _kb_tensor, _kb_buffer = 0, None, None, None
+        _set_shards([], [])
+        _version += 1
+
+        # Postings are precomputed; only entries added since the last save are tokenized
+        _keyword_index = KeywordIndex.load(KEYWORD_INDEX_FILE)
+        saved_docs = _keyword_index.num_docs
+        _load_faiss_index()
+        saved_rows = _index.ntotal if _index is not None else 0
+        _sync()
+        if _index is not None and _index.ntotal != _num_entries:
+            # The saved graph does not match the shards on disk; rebuild it
+            print(f"[INFO] Rebuilding FAISS index ({_index.ntotal} indexed rows, {_num_entries} on disk)")
+            shards, _index = _shards, None
+            _set_shards([], [])
+            for shard in shards:
+                _add_to_index(shard)
+        if _hnsw() and _index is not None and _index.ntotal != saved_rows:
+            save_index()
+        if _keyword_index.num_docs != _num_entries:
+            _keyword_index = KeywordIndex()
+            _keyword_index.add(_fetch_texts(0, _num_entries))
+        if _keyword_index.num_docs != saved_docs:
+            _keyword_index.save(KEYWORD_INDEX_FILE)
+
+        print(f"[INFO] Loaded {_num_entries} chunks into the {_backend_name()} index")
+
+
+def add_entries(new_entries: List[Dict]) -> int:
+    """Append entries to the knowledge base and index. Returns the total chunk count."""
+    global _version
+
+    with _lock, _write_lock():
+        # Under the write lock, so the shard path and row numbers picked here are
+        # not picked by another worker too
+        _refresh_if_changed()
+        _drop_orphan_rows()
+
+        # Embeddings are L2-normalized at ingest time
+        shard = _write_shard([entry["embedding"] for entry in new_entries], _shard_path(_num_entries))
+        # Token sets are only needed to extend the keyword index; they are not persisted
+        metadata = [{k: v for k, v in entry.items() if k not in ("embedding", "token_set")} for entry in new_entries]
+        token_sets = [entry["token_set"] for entry in new_entries] if all("token_set" in entry for entry in new_entries) else None
+        _insert_rows(_db, _num_entries, metadata)
+
+        _add_to_index(shard)
+        _add_rows(len(metadata), token_sets)
+        _version += 1
+
+        # After publishing, so searches run during the merge I/O
+        _compact_shards()
+        _coalesce_shards()
+
+        return _num_entries
+
+
+def get_entries(start: int = 0) -> List[Dict]:
+    """Return the metadata of the indexed chunks from row start on, read from disk."""
+    _refresh_for_read()
+    with _index_lock.read():
+        cursor = _reader().execute("SELECT data FROM chunks WHERE row >= ? AND row < ? ORDER BY row", (start, _num_entries))
+        return [orjson.loads(data) for data, in cursor]
+
+
+def count_entries() -> int:
+    """Return the number of indexed chunks."""
+    _refresh_for_read()
+    return _num_entries
+
+
+def get_version() -> int:
+    """Return a counter that changes whenever the knowledge base content changes."""
+    _refresh_for_read()
+    return _version
+
+
+def _top_scores(scores: Dict[int, float], k: int) -> List[Tuple[int, float]]:
+    """The k best (doc_id, score) pairs, best first with ties in document order.
+
+    A linear-time partition finds the k-th best score, so only the candidates
+    at or above it are sorted.
+    """
+    if k <= 0 or not scores:
+        return []
+    doc_ids = np.fromiter(scores.keys(), dtype=np.int64, count=len(scores))
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+    if k < len(values):
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        keep = np.flatnonzero(values >= kth)
+        doc_ids, values = doc_ids[keep], values[keep]
+    order = np.lexsort((doc_ids, -values))[:k]
+    return list(zip(doc_ids[order].tolist(), values[order].tolist()))
+
+
+def keyword_search(query: Union[str, Query], top_k: Optional[int] = None) -> List[Tuple[float, Dict]]:
+    """Return (score, entry) pairs for every chunk sharing a term with the query.
+
+    With top_k, only the top_k best scoring chunks are returned (and read from disk).
+    A parsed Query is searched with its precomputed token set.
+    """
+    query_words = query.token_set if isinstance(query, Query) else tokenize(query)
+    _refresh_for_read()
+    with _index_lock.read():
+        scores = _keyword_index.score(query_words)
+        if top_k is not None:
+            scores = _top_scores(scores, top_k)
+        else:
+            # Document order, so ties rank the same as a scan over all entries
+            scores = sorted(scores.items())
+        entries = _fetch_entries([doc_id for doc_id, _ in scores])
+        return [(score, entry) for (_, score), entry in zip(scores, entries)]
+
+
+def _score_block(block: np.ndarray, q: np.ndarray) -> np.ndarray:
+    # Rows and query are unit length, so cosine reduces to a dot product
+    if simsimd is not None:
+        return np.asarray(simsimd.cdist(q[None, :], block, metric="dot"), dtype=np.float32)[0]
+    return block @ q
+
+
+def _jit_top_k(q: np.ndarray, k: int) -> List[Tuple[float, int]]:
+    """Top-k of (score, row) using the Numba kernel on each shard."""
+    top = []
+    offset = 0
+    for shard in _shards:
+        scores, ids = topk_cosine(q, shard, k)
+        top.extend((score, i + offset) for score, i in zip(scores.tolist(), ids.tolist()) if i >= 0)
+        top = heapq.nlargest(k, top)
+        offset += len(shard)
+    return top
+
+
+def _tiled_top_k(q: np.ndarray, k: int) -> List[Tuple[float, int]]:
+    """Score the shards tile by tile, keeping only a running top-k of (score, row)."""
+    if _quantized():
+        q_codes, q_scale = _quantize(q[None, :])
+        q_codes, q_scale = q_codes[0].astype(np.int32), q_scale[0]
+
+    top = []
+    offset = 0
+    for shard_id, shard in enumerate(_shards):
+        for start in range(0, len(shard), TILE_ROWS):
+            if _quantized():
+                codes, scales = _quantized_shards[shard_id]
+                end = start + TILE_ROWS
+                # Integer dot product, rescaled by the row and query scales
+                scores = (codes[start:end].astype(np.int32) @ q_codes) * (scales[start:end] * q_scale)
+            else:
+                scores = _score_block(shard[start:start + TILE_ROWS], q)
+            kk = min(k, len(scores))
+            best = np.argpartition(-scores, kk - 1)[:kk]
+            top.extend(zip(scores[best].tolist(), (best + offset + start).tolist()))
+            top = heapq.nlargest(k, top)
+        offset += len(shard)
+    return top
+
+
+def semantic_search(query_emb: List[float], top_k: int = 5) -> List[Tuple[float, Dict]]:
+    """Return the top_k (score, entry) pairs by cosine similarity, best first."""
+    _refresh_for_read()
+    with _index_lock.read():
+        if not _num_entries or top_k <= 0:
+            return []
+
+        q = np.asarray(query_emb, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        q = q / norm
+        k = min(top_k, _num_entries)
+
+        if _kb_tensor is not None:
+            with torch.inference_mode():
+                q_t = torch.as_tensor(q, device=KB_DEVICE, dtype=_kb_tensor.dtype)
+                scores, ids = torch.topk(_kb_tensor @ q_t, k)
+            scores, ids = scores.tolist(), ids.tolist()
+        elif _pca_applied():
+            # Over-fetch with the reduced vectors, then keep the exact top k by full cosine
+            _, ids = _index.search(q[None, :], min(k * PCA_RERANK_FACTOR, _num_entries))
+            ids = ids[0][ids[0] >= 0]
+            scores = _row_vectors(ids) @ q
+            best = np.argsort(-scores, kind="stable")[:k]
+            scores, ids = scores[best], ids[best]
+        elif faiss is not None:
+            scores, ids = _index.search(q[None, :], k)
+            scores, ids = scores[0], ids[0]
+        else:
+            # Score the memory-mapped shards with the JIT kernel, or in cache-sized tiles
+            top = _jit_top_k(q, k) if topk_cosine is not None and not _quantized() else _tiled_top_k(q, k)
+            scores, ids = [score for score, _ in top], [i for _, i in top]
+
+        hits = [(float(score), int(i)) for score, i in zip(scores, ids) if i >= 0]
+        entries = _fetch_entries([i for _, i in hits])
+        return [(score, entry) for (score, _), entry in zip(hits, entries)]
@@ -1,47 +1,58 @@
+from string import Template
 from mistralai import Mistral
 
-def get_prompt_template(intent: str, context: str, query: str) -> str:
-    """Get appropriate prompt template based on intent."""
-    
-    if intent == "greeting":
-        return "You are a helpful assistant. Respond to the greeting in a friendly manner."
-    
-    elif intent == "finish":
-        return "You are a helpful assistant. The user is ending the conversation. Respond with a polite goodbye message, thanking them for using the service and wishing them well."
-    
-    elif intent == "list_request":
-        return f"""You are a helpful assistant. Based on the following context, provide a structured list of items related to the query.
+# Built once at import; the context and query are substituted per call. The
+# templates are flush-left so no indentation is sent to the model as tokens.
+_GREETING_PROMPT = "You are a helpful assistant. Respond to the greeting in a friendly manner."
+_FINISH_PROMPT = "You are a helpful assistant. The user is ending the conversation. Respond with a polite goodbye message, thanking them for using the service and wishing them well."
+
+_LIST_TEMPLATE = Template("""\
+You are a helpful assistant. Based on the following context, provide a structured list of items related to the query.
+
+Context:
+$context
 
-        Context:
-        {context}
+Query: $query
 
-        Query: {query}
+Please provide a clear, organized list with bullet points or numbered items. If the information is not available in the context, say "The requested information is not available in the provided context."
 
-        Please provide a clear, organized list with bullet points or numbered items. If the information is not available in the context, say "The requested information is not available in the provided context."
+List:""")
 
-        List:"""
+_SUMMARY_TEMPLATE = Template("""\
+You are a helpful assistant. Based on the following context, provide a comprehensive summary into 3 to 5 shortbullet points. Answer in plain text only. 
 
-    elif intent == "summary":
-        return f"""You are a helpful assistant. Based on the following context, provide a comprehensive summary into 3 to 5 shortbullet points. Answer in plain text only. 
+Context:
+$context
 
-        Context:
-        {context}
+Query: $query
 
-        Query: {query}
+Please provide a well-structured summary covering the main points. If the information is not available in the context, say "The requested information is not available in the provided context."
 
-        Please provide a well-structured summary covering the main points. If the information is not available in the context, say "The requested information is not available in the provided context."
+Summary:""")
 
-        Summary:"""
+_QUESTION_TEMPLATE = Template("""\
+You are a helpful assistant. Use only the following context to answer the question. If the answer cannot be found in the context, say "The information is not available in the provided context."
 
-    else:  # general or question
-        return f"""You are a helpful assistant. Use only the following context to answer the question. If the answer cannot be found in the context, say "The information is not available in the provided context."
+Context:
+$context
 
-        Context:
-        {context}
+Question: $query
 
-        Question: {query}
+Answer:""")
 
-        Answer:"""
+_TEMPLATES = {"list_request": _LIST_TEMPLATE, "summary": _SUMMARY_TEMPLATE}
+
+def get_prompt_template(intent: str, context: str, query: str) -> str:
+    """Get appropriate prompt template based on intent."""
+    
+    if intent == "greeting":
+        return _GREETING_PROMPT
+    
+    elif intent == "finish":
+        return _FINISH_PROMPT
+    
+    # general or question
+    return _TEMPLATES.get(intent, _QUESTION_TEMPLATE).substitute(context=context, query=query)
 
 def generate_answer(prompt: str, llm_client: Mistral) -> str:
     """Generate answer using LLM."""
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Tuple
+
+from services.keyword_index import tokenize
+
+
+@dataclass(frozen=True)
+class Query:
+    """A query string with the normalized forms its consumers share.
+
+    Built once per request, so the cache key, security check, intent detection
+    and keyword search do not each lowercase and tokenize the text again.
+    """
+    raw: str
+    # Lowercased and stripped: cache keys, intent rules and keyword checks
+    lower: str
+    # Keyword analyzer output (services.keyword_index.tokenize)
+    tokens: Tuple[str, ...]
+    token_set: FrozenSet[str]
+
+    @classmethod
+    def parse(cls, raw: str) -> "Query":
+        lower = raw.lower().strip()
+        tokens = tuple(tokenize(lower))
+        return cls(raw=raw, lower=lower, tokens=tokens, token_set=frozenset(tokens))
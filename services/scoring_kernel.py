@@ -0,0 +1,44 @@
+import numpy as np
+from numba import njit, prange, get_num_threads
+from typing import Tuple
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _topk_cosine(q, kb, k, n_blocks):
+    n, d = kb.shape
+    step = (n + n_blocks - 1) // n_blocks
+    block_scores = np.full((n_blocks, k), -np.inf, dtype=np.float32)
+    block_ids = np.full((n_blocks, k), -1, dtype=np.int64)
+
+    # Each block keeps its own sorted top-k buffer, so threads never share state
+    for b in prange(n_blocks):
+        end = min((b + 1) * step, n)
+        for i in range(b * step, end):
+            score = np.float32(0.0)
+            for j in range(d):
+                score += kb[i, j] * q[j]
+            if score > block_scores[b, k - 1]:
+                pos = k - 1
+                while pos > 0 and block_scores[b, pos - 1] < score:
+                    block_scores[b, pos] = block_scores[b, pos - 1]
+                    block_ids[b, pos] = block_ids[b, pos - 1]
+                    pos -= 1
+                block_scores[b, pos] = score
+                block_ids[b, pos] = i
+
+    # Merge the per-block candidates
+    flat_scores = block_scores.ravel()
+    flat_ids = block_ids.ravel()
+    order = np.argsort(-flat_scores)[:k]
+    return flat_scores[order], flat_ids[order]
+
+
+def topk_cosine(q: np.ndarray, kb: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine similarity of q against the rows of kb, best first.
+
+    Both q and the rows of kb must already be L2-normalized.
+    """
+    n = kb.shape[0]
+    k = min(k, n)
+    n_blocks = max(1, min(get_num_threads(), n))
+    return _topk_cosine(np.asarray(q, dtype=np.float32), np.asarray(kb), k, n_blocks)
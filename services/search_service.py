@@ -1,52 +1,35 @@
-import numpy as np
-from typing import List, Dict
+import heapq
+from typing import List, Dict, Tuple, Optional
 
-def cosine_similarity(vec_a, vec_b):
-    """Compute cosine similarity between two vectors."""
-    try:
-        a, b = np.array(vec_a), np.array(vec_b)
-        norm_a = np.linalg.norm(a)
-        norm_b = np.linalg.norm(b)
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-        return np.dot(a, b) / (norm_a * norm_b)
-    except Exception as e:
-        print(f"Error in cosine_similarity: {e}")
-        return 0.0
+from services.knowledge_base import semantic_search, keyword_search
 
-def hybrid_search(query: str, kb_entries: List[Dict], top_k: int = 5) -> List[Dict]:
-    """Combine semantic and keyword search."""
+def hybrid_search(query: str, top_k: int = 5,
+                  semantic_scores: Optional[List[Tuple[float, Dict]]] = None,
+                  keyword_scores: Optional[List[Tuple[float, Dict]]] = None) -> List[Dict]:
+    """Combine semantic and keyword search.
+
+    semantic_scores and keyword_scores are (score, entry) candidates, as returned
+    by the knowledge base's vector and keyword indexes; if not given they are
+    fetched from those indexes here.
+    """
     try:
-        from utils import get_embedding
-        
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
+        from utils import get_query_embedding
         
-        # Semantic search
-        semantic_scores = []
-        try:
-            query_emb = get_embedding(query)
-            for entry in kb_entries:
-                if "embedding" in entry:
-                    score = cosine_similarity(query_emb, entry["embedding"])
-                    semantic_scores.append((score, entry))
-            semantic_scores.sort(key=lambda x: x[0], reverse=True)
-        except Exception as e:
-            print(f"Error in semantic search: {e}")
-            semantic_scores = []
+        # Semantic search (one vectorized/indexed top-k over the resident embedding matrix)
+        if semantic_scores is None:
+            try:
+                semantic_scores = semantic_search(get_query_embedding(query), top_k*2)
+            except Exception as e:
+                print(f"Error in semantic search: {e}")
+                semantic_scores = []
         
         # Keyword search
-        keyword_scores = []
-        for entry in kb_entries:
-            text_lower = entry.get("text", "").lower()
-            text_words = set(text_lower.split())
-            
-            overlap = len(query_words.intersection(text_words))
-            if overlap > 0:
-                score = overlap / len(text_words) if text_words else 0
-                keyword_scores.append((score, entry))
+        if keyword_scores is None:
+            keyword_scores = keyword_search(query, top_k*2)
         
-        keyword_scores.sort(key=lambda x: x[0], reverse=True)
+        # Only the top 2*top_k of each list are combined, so a bounded heap
+        # selection replaces a full sort
+        keyword_scores = heapq.nlargest(top_k*2, keyword_scores, key=lambda x: x[0])
         
         # Combine scores (weighted average)
         combined_scores = {}
@@ -54,14 +37,14 @@ def hybrid_search(query: str, kb_entries: List[Dict], top_k: int = 5) -> List[Di
             chunk_id = entry.get("chunk_id", "")
             combined_scores[chunk_id] = combined_scores.get(chunk_id, 0) + score * 0.7
         
-        for score, entry in keyword_scores[:top_k*2]:
+        for score, entry in keyword_scores:
             chunk_id = entry.get("chunk_id", "")
             combined_scores[chunk_id] = combined_scores.get(chunk_id, 0) + score * 0.3
         
-        # Get top results
-        all_entries = {entry.get("chunk_id", ""): entry for entry in kb_entries}
+        # Get top results (only candidates can be in the combined ranking)
+        all_entries = {entry.get("chunk_id", ""): entry for _, entry in semantic_scores[:top_k*2] + keyword_scores}
         top_entries = []
-        for chunk_id, score in sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:top_k]:
+        for chunk_id, score in heapq.nlargest(top_k, combined_scores.items(), key=lambda x: x[1]):
             if chunk_id in all_entries:
                 entry = all_entries[chunk_id].copy()
                 entry["combined_score"] = score
@@ -1,27 +1,27 @@
 import re
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, FrozenSet, Tuple
 
-def check_sensitive_content(query: str) -> Dict[str, Any]:
+from services.query import Query
+
+# PII patterns, combined so one scan of the query finds every type
+_PII_RE = re.compile(
+    r'(?P<ssn>\b\d{3}-\d{2}-\d{4}\b)'
+    r'|(?P<credit_card>\b\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\b)'
+    r'|(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)'
+    r'|(?P<phone>\b\d{3}-\d{3}-\d{4}\b)'
+)
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+def check_sensitive_content(query: Query) -> Dict[str, Any]:
     """Check for sensitive content in queries."""
     try:
-        query_lower = query.lower()
-        
-        # PII patterns
-        pii_patterns = [
-            r'\b\d{3}-\d{2}-\d{4}\b',  # SSN
-            r'\b\d{4}\s?\d{4}\s?\d{4}\s?\d{4}\b',  # Credit card
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email
-            r'\b\d{3}-\d{3}-\d{4}\b',  # Phone
-        ]
-        
-        pii_found = []
-        for pattern in pii_patterns:
-            if re.search(pattern, query):
-                pii_found.append(pattern)
+        # PII types found, in order of first occurrence
+        pii_found = list(dict.fromkeys(match.lastgroup for match in _PII_RE.finditer(query.raw)))
         
         # Legal/medical keywords
         sensitive_keywords = ["legal advice", "medical advice", "diagnosis", "treatment", "lawsuit", "court"]
-        sensitive_found = [kw for kw in sensitive_keywords if kw in query_lower]
+        sensitive_found = [kw for kw in sensitive_keywords if kw in query.lower]
         
         return {
             "has_pii": len(pii_found) > 0,
@@ -34,11 +34,16 @@ def check_sensitive_content(query: str) -> Dict[str, Any]:
         print(f"Error in check_sensitive_content: {e}")
         return {"has_pii": False, "has_sensitive": False, "pii_patterns": [], "sensitive_keywords": [], "should_refuse": False}
 
+@lru_cache(maxsize=256)
+def _context_wordset(context_chunks: Tuple[str, ...]) -> FrozenSet[str]:
+    """Lowercased words of the context, built once per set of retrieved chunks."""
+    return frozenset(" ".join(context_chunks).lower().split())
+
 def check_evidence(answer: str, context_chunks: List[str]) -> Dict[str, Any]:
     """Check if answer is supported by evidence."""
     try:
-        answer_sentences = re.split(r'[.!?]+', answer)
-        context_text = " ".join(context_chunks).lower()
+        answer_sentences = _SENTENCE_SPLIT_RE.split(answer)
+        context_words = _context_wordset(tuple(context_chunks))
         
         unsupported_claims = []
         for sentence in answer_sentences:
@@ -48,9 +53,8 @@ def check_evidence(answer: str, context_chunks: List[str]) -> Dict[str, Any]:
             
             sentence_words = set(sentence.split())
             if len(sentence_words) > 3:
-                context_words = set(context_text.split())
-                unique_words = sentence_words - context_words
-                if len(unique_words) / len(sentence_words) > 0.5:
+                unique_count = sum(1 for word in sentence_words if word not in context_words)
+                if unique_count / len(sentence_words) > 0.5:
                     unsupported_claims.append(sentence)
         
         evidence_score = max(0, 1 - len(unsupported_claims) / len(answer_sentences)) if answer_sentences else 0
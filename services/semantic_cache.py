@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from utils import normalize_embeddings
+
+
+class SemanticCache:
+    """Cache of answers keyed by query embedding instead of query text.
+
+    A lookup returns the answer of the most similar cached query in the same
+    namespace if its cosine similarity is at least threshold, so near-duplicate
+    phrasings share one answer. Entries expire after ttl seconds and the least
+    recently used entry is evicted beyond maxsize.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 1000, ttl: float = 3600):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # entry id -> (namespace, unit-length embedding, response, created)
+        self._entries: "OrderedDict[int, Tuple[Hashable, np.ndarray, Any, float]]" = OrderedDict()
+        # namespace -> (entry ids, stacked embeddings), rebuilt after changes
+        self._matrices: Dict[Hashable, Tuple[List[int], np.ndarray]] = {}
+        self._next_id = 0
+
+    def get(self, namespace: Hashable, query_emb) -> Optional[Any]:
+        query_emb = normalize_embeddings(query_emb)[0]
+        with self._lock:
+            self._expire()
+            ids, matrix = self._matrix(namespace)
+            if not ids:
+                return None
+            # One matrix-vector product against every cached query of the namespace
+            scores = matrix @ query_emb
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id][2]
+
+    def put(self, namespace: Hashable, query_emb, response: Any) -> None:
+        query_emb = normalize_embeddings(query_emb)[0]
+        with self._lock:
+            self._entries[self._next_id] = (namespace, query_emb, response, time.monotonic())
+            self._next_id += 1
+            self._matrices.pop(namespace, None)
+            while len(self._entries) > self.maxsize:
+                _, (evicted_namespace, _, _, _) = self._entries.popitem(last=False)
+                self._matrices.pop(evicted_namespace, None)
+
+    def _expire(self) -> None:
+        # Entries are in insertion order only until a hit moves one to the end,
+        # so scan all of them (the cache is small)
+        cutoff = time.monotonic() - self.ttl
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry[3] < cutoff]
+        for entry_id in expired:
+            namespace = self._entries.pop(entry_id)[0]
+            self._matrices.pop(namespace, None)
+
+    def _matrix(self, namespace: Hashable) -> Tuple[List[int], np.ndarray]:
+        if namespace not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry[0] == namespace]
+            matrix = np.stack([self._entries[entry_id][1] for entry_id in ids]) if ids else None
+            self._matrices[namespace] = (ids, matrix)
+        return self._matrices[namespace]
@@ -1,34 +1,113 @@
+import os
+import tempfile
+import threading
+import multiprocessing
 import pdfplumber
-from pdf2image import convert_from_bytes
+from concurrent.futures import ProcessPoolExecutor
+from pdf2image import convert_from_path
 import pytesseract
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-def extract_text_from_pdf(file) -> Dict[str, Any]:
-    """Extract text from PDF with metadata."""
-    text = ""
+# Text extraction and OCR are CPU-bound, so pages are processed in a process pool
+# shared by all uploads
+EXTRACTION_WORKERS = os.cpu_count() or 1
+# Below this many pages, pool overhead outweighs parallel pdfplumber extraction
+PARALLEL_EXTRACTION_MIN_PAGES = 5
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Forked workers start without re-importing the app
+            mp_context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+            _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=mp_context)
+        return _process_pool
+
+def _ocr_page(image_path: str) -> str:
+    """OCR one page image; a failing page yields no text instead of failing the document."""
+    try:
+        return pytesseract.image_to_string(image_path)
+    except Exception as e:
+        print(f"Error in OCR of page: {e}")
+        return ""
+
+def _page_text(page) -> Optional[str]:
+    """Text of a pdfplumber page, or None if the page has no text layer."""
+    if not page.chars:
+        return None
+    return page.extract_text() or ""
+
+def _extract_page_range(pdf_path: str, first: int, last: int) -> List[Optional[str]]:
+    """Worker: open the PDF and extract pages first..last-1 (pdfplumber pages don't pickle)."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_page_text(page) for page in pdf.pages[first:last]]
+
+def extract_text_from_pdf(pdf_path: str) -> Dict[str, Any]:
+    """Extract text from PDF with metadata.
+    
+    Also returns the 1-based numbers of pages without a text layer ("image_pages"),
+    or None if the PDF could not be read, so OCR can be limited to those pages.
+    """
     metadata = {"pages": 0, "extraction_method": "pdfplumber"}
+    page_texts = None
     
     try:
-        with pdfplumber.open(file) as pdf:
-            metadata["pages"] = len(pdf.pages)
-            for page in pdf.pages:
-                page_text = page.extract_text() or ""
-                text += page_text + "\n"
+        with pdfplumber.open(pdf_path) as pdf:
+            num_pages = len(pdf.pages)
+            metadata["pages"] = num_pages
+            if num_pages < PARALLEL_EXTRACTION_MIN_PAGES or EXTRACTION_WORKERS == 1:
+                page_texts = [_page_text(page) for page in pdf.pages]
+        
+        if page_texts is None:
+            # Split the pages into one contiguous range per worker
+            step = -(-num_pages // EXTRACTION_WORKERS)
+            pool = _get_process_pool()
+            futures = [pool.submit(_extract_page_range, pdf_path, first, min(first + step, num_pages))
+                       for first in range(0, num_pages, step)]
+            page_texts = [page_text for future in futures for page_text in future.result()]
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
-        return {"text": "", "metadata": metadata}
+        return {"text": "", "metadata": metadata, "image_pages": None}
     
-    return {"text": text, "metadata": metadata}
+    text = "".join(page_text + "\n" for page_text in page_texts if page_text is not None)
+    image_pages = [page_number for page_number, page_text in enumerate(page_texts, start=1) if page_text is None]
+    return {"text": text, "metadata": metadata, "image_pages": image_pages}
 
-def extract_text_with_ocr(file_bytes: bytes) -> Dict[str, Any]:
-    """Extract text from scanned PDF using OCR."""
+def _page_runs(pages: List[int]) -> List[List[int]]:
+    """Group sorted page numbers into [first, last] runs of consecutive pages."""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return runs
+
+def extract_text_with_ocr(pdf_path: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Extract text from scanned PDF using OCR.
+    
+    pages limits OCR to the given 1-based page numbers; None means every page.
+    Pages are rasterized to JPEG files in a temporary folder, and OCR workers
+    read them from there instead of receiving pickled images.
+    """
     try:
-        images = convert_from_bytes(file_bytes)
-        text = ""
-        metadata = {"pages": len(images), "extraction_method": "ocr"}
-        
-        for img in images:
-            text += pytesseract.image_to_string(img) + "\n"
+        with tempfile.TemporaryDirectory() as image_dir:
+            options = {"output_folder": image_dir, "fmt": "jpeg", "paths_only": True, "thread_count": EXTRACTION_WORKERS}
+            if pages is None:
+                image_paths = convert_from_path(pdf_path, **options)
+            else:
+                image_paths = []
+                for first_page, last_page in _page_runs(pages):
+                    image_paths.extend(convert_from_path(pdf_path, first_page=first_page, last_page=last_page, **options))
+            metadata = {"pages": len(image_paths), "extraction_method": "ocr"}
+            
+            if len(image_paths) > 1:
+                texts = list(_get_process_pool().map(_ocr_page, image_paths))
+            else:
+                texts = [_ocr_page(image_path) for image_path in image_paths]
+        text = "".join(page_text + "\n" for page_text in texts)
         
         return {"text": text, "metadata": metadata}
     except Exception as e:
@@ -1,70 +1,143 @@
 import os
 import re
+import asyncio
+import httpx
+import numpy as np
+from functools import lru_cache
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 from mistralai import Mistral
+from mistralai.utils import BackoffStrategy, RetryConfig
+
+try:
+    import h2  # noqa: F401 (lets httpx negotiate HTTP/2)
+except ImportError:
+    h2 = None
+
+from services.keyword_index import tokenize
 
 load_dotenv()
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 if not MISTRAL_API_KEY:
     raise ValueError("MISTRAL_API_KEY environment variable is required")
 
-client = Mistral(api_key=MISTRAL_API_KEY)
+# One pooled HTTP/2 connection set shared by every Mistral call (LLM and
+# embeddings); requests failing with 429/5xx or a connection error are retried
+# with exponential backoff
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP_TIMEOUT = 30
+RETRY_CONFIG = RetryConfig("backoff", BackoffStrategy(initial_interval=500, max_interval=8000, exponent=2, max_elapsed_time=30000), retry_connection_errors=True)
+
+_http_client = httpx.Client(http2=h2 is not None, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+_async_http_client = httpx.AsyncClient(http2=h2 is not None, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+client = Mistral(api_key=MISTRAL_API_KEY, client=_http_client, async_client=_async_http_client, retry_config=RETRY_CONFIG)
+
+async def close_http_clients() -> None:
+    _http_client.close()
+    await _async_http_client.aclose()
+
+# Embedding requests in flight at once
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", 8))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
 
 
 def clean_text(text: str) -> str:
     # Remove excessive whitespace and line breaks
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     return text.strip()
 
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
+    starts = np.arange(0, len(text), chunk_size - overlap)
+    return [text[start:start + chunk_size] for start in starts.tolist()]
 
 def smart_chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[Dict[str, Any]]:
-    """Enhanced chunking that respects sentence boundaries."""
-    sentences = re.split(r'[.!?]+', text)
+    """Enhanced chunking that respects sentence boundaries.
+
+    Each chunk also carries its keyword "token_set", so the keyword index does
+    not tokenize the text again.
+    """
+    sentences = _SENTENCE_SPLIT_RE.split(text)
     chunks = []
-    current_chunk = ""
-    chunk_id = 0
+    # The current chunk is " ".join(current_parts), current_len characters long
+    current_parts = []
+    current_len = 0
+    
+    def emit() -> List[str]:
+        chunk = " ".join(current_parts)
+        words = chunk.split()
+        chunks.append({
+            "text": chunk.strip(),
+            "chunk_id": len(chunks),
+            "word_count": len(words),
+            "char_count": current_len,
+            "token_set": frozenset(tokenize(chunk))
+        })
+        return words
     
     for sentence in sentences:
         sentence = sentence.strip()
         if not sentence:
             continue
             
-        if len(current_chunk) + len(sentence) > chunk_size and current_chunk:
-            chunks.append({
-                "text": current_chunk.strip(),
-                "chunk_id": chunk_id,
-                "word_count": len(current_chunk.split()),
-                "char_count": len(current_chunk)
-            })
-            chunk_id += 1
+        if current_len + len(sentence) > chunk_size and current_parts:
+            words = emit()
             # Overlap handling
-            overlap_text = " ".join(current_chunk.split()[-overlap//4:])
-            current_chunk = overlap_text + " " + sentence
+            overlap_text = " ".join(words[-overlap//4:])
+            current_parts = [overlap_text, sentence]
+            current_len = len(overlap_text) + 1 + len(sentence)
         else:
-            current_chunk += " " + sentence if current_chunk else sentence
+            current_len += len(sentence) + (1 if current_parts else 0)
+            current_parts.append(sentence)
     
-    if current_chunk:
-        chunks.append({
-            "text": current_chunk.strip(),
-            "chunk_id": chunk_id,
-            "word_count": len(current_chunk.split()),
-            "char_count": len(current_chunk)
-        })
+    if current_parts:
+        emit()
     
     return chunks
 
-def get_embedding(text: str) -> List[float]:
+def get_embedding(text: str) -> np.ndarray:
     response = client.embeddings.create(
         model="mistral-embed",
         inputs=[text]
     )
-    return response.data[0].embedding
+    return np.asarray(response.data[0].embedding, dtype=np.float32)
+
+@lru_cache(maxsize=4096)
+def get_query_embedding(text: str) -> np.ndarray:
+    """Embedding of a query string, memoized for repeated queries.
+
+    The cached array is shared between callers, so it is read-only.
+    """
+    embedding = get_embedding(text)
+    embedding.setflags(write=False)
+    return embedding
+
+async def get_embeddings_batch(texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """Embed many texts with one API request per batch_size texts.
+
+    Up to EMBEDDING_CONCURRENCY requests are in flight at once; the result is a
+    float32 (len(texts), dim) matrix in the order of texts.
+    """
+    semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+    async def embed(batch: List[str]) -> np.ndarray:
+        async with semaphore:
+            response = await client.embeddings.create_async(
+                model="mistral-embed",
+                inputs=batch
+            )
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*[embed(batch) for batch in batches])
+    return np.concatenate(results) if results else np.empty((0, 0), dtype=np.float32)
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """Return embeddings as a float32 matrix with L2-normalized rows."""
+    mat = np.asarray(embeddings, dtype=np.float32)
+    mat = mat.reshape(1, -1) if mat.ndim == 1 else mat
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    # Out of place: the input may be a read-only or memory-mapped array
+    return mat / norms